@@ -3,7 +3,104 @@ import streamlit as st
 from google.generativeai import GenerativeModel
 import google.generativeai as genai
 import os
-from datetime import datetime
+import hashlib
+import hmac
+import json
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from streamlit.runtime.scriptrunner import RerunException, StopException
+
+# ============================================================================
+# 요청 단위 마감 시간 및 취소 처리
+# 분석 버튼 재클릭, 페이지 이동, 탭 종료 시 남은 코치 단계를 건너뛰고
+# 진행 중인 모델 호출을 포기하여 불필요한 API 사용량을 줄임
+# ============================================================================
+
+# 분석 요청 전체에 허용되는 최대 시간(초)
+REQUEST_TIMEOUT_SECONDS = 300
+# 다음 코치 단계를 시작하기 위해 남아 있어야 하는 최소 시간(초)
+MIN_STAGE_SECONDS = 20
+# 진행 중인 모델 호출의 취소 여부를 확인하는 간격(초)
+CANCEL_POLL_INTERVAL = 0.5
+
+
+class RequestCancelledError(Exception):
+    """요청이 취소되었거나 마감 시간이 지나 작업을 중단할 때 발생하는 예외"""
+    
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason  # "cancelled" 또는 "expired"
+
+
+class RequestContext:
+    """마감 시간과 취소 토큰을 코치 파이프라인 전체에 전달하는 요청 컨텍스트"""
+    
+    def __init__(self, timeout=REQUEST_TIMEOUT_SECONDS):
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.heartbeat = None  # 모델 응답 대기 중 주기적으로 호출되는 함수
+        self._cancel_event = threading.Event()
+    
+    def cancel(self):
+        """요청 취소 (다른 스레드에서 호출해도 안전)"""
+        self._cancel_event.set()
+    
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+    
+    def remaining(self):
+        """마감까지 남은 시간(초), 마감 시간이 없으면 None"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+    
+    def check(self, required_seconds=0):
+        """취소되었거나 남은 시간이 required_seconds 이하이면 RequestCancelledError 발생"""
+        if self.is_cancelled():
+            raise RequestCancelledError("cancelled")
+        remaining = self.remaining()
+        if remaining is not None and remaining <= required_seconds:
+            raise RequestCancelledError("expired")
+    
+    def run(self, func, *args, **kwargs):
+        """func를 별도 스레드에서 실행하고, 취소되거나 마감되면 결과를 기다리지 않고 포기"""
+        outcome = {}
+        done = threading.Event()
+        
+        def worker():
+            try:
+                outcome["value"] = func(*args, **kwargs)
+            except Exception as e:
+                outcome["error"] = e
+            finally:
+                done.set()
+        
+        threading.Thread(target=worker, daemon=True).start()
+        while not done.wait(CANCEL_POLL_INTERVAL):
+            self.check()
+            if self.heartbeat:
+                self.heartbeat()
+        
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["value"]
+
+
+def generate_text(model, prompt, request_context=None):
+    """AI 모델 호출 공통 처리 (요청 컨텍스트가 있으면 마감 시간 내에서 취소 가능하게 실행)"""
+    if request_context is None:
+        return model.generate_content(prompt).text
+    
+    request_context.check()
+    kwargs = {}
+    remaining = request_context.remaining()
+    if remaining is not None:
+        kwargs["request_options"] = {"timeout": remaining}
+    response = request_context.run(model.generate_content, prompt, **kwargs)
+    return response.text
+
 
 # ============================================================================
 # 에이전틱 워크플로우 기반 헬스 케어 코치 시스템
@@ -25,53 +122,126 @@ class HealthCoachTeam:
         
         # 워크플로우 로그 초기화
         self.workflow_logs = []
+        
+        # 다음 단계를 시작하기 위해 필요한 최소 잔여 시간
+        self.min_stage_seconds = MIN_STAGE_SECONDS
     
-    def get_health_advice(self, service_type, input_data):
-        """사용자 요청에 따라 3명의 코치가 순차적으로 협업하여 조언 제공"""
+    def get_health_advice(self, service_type, input_data, request_context=None, speculative_cache=None):
+        """사용자 요청에 따라 3명의 코치가 순차적으로 협업하여 조언 제공
+        
+        요청이 취소되거나 남은 시간이 다음 단계를 감당할 수 없으면 남은 단계를 건너뛰고,
+        건너뛴 단계의 결과는 None으로 반환
+        speculative_cache가 주어지면 같은 입력으로 미리 실행된 건강 평가 결과를 재사용
+        """
+        if request_context is None:
+            request_context = RequestContext()
+        
         # 워크플로우 기록 시작
         workflow_log = {
             "service_type": service_type,
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "coaches_involved": ["HealthAssessmentCoach", "NutritionCoach", "FitnessCoach"],
-            "steps": []
+            "steps": [],
+            "status": "completed",
+            "cancelled_steps": 0,
+            "expired_steps": 0,
+            "failed_steps": 0
         }
+        results = {"assessment": None, "nutrition": None, "fitness": None}
         
-        # 1단계: 건강 평가 코치의 초기 분석 및 제안
-        st.markdown("### 1단계: 건강 상태 평가 및 분석 중...")
-        with st.spinner("건강 평가 코치가 분석 중입니다..."):
-            initial_assessment = self.assessment_coach.analyze(service_type, input_data)
-            workflow_log["steps"].append({
-                "coach": "HealthAssessmentCoach",
-                "action": "initial_assessment"
-            })
+        def run_assessment():
+            # 입력 중에 미리 실행된 건강 평가가 있으면 그대로 사용
+            if speculative_cache is not None:
+                prewarmed = speculative_cache.take(service_type, input_data, request_context)
+                if prewarmed is not None:
+                    workflow_log["steps"][0]["prewarmed"] = True
+                    return prewarmed
+            return self.assessment_coach.analyze(service_type, input_data, request_context)
         
+        # 1단계: 건강 평가 코치의 초기 분석 및 제안
         # 2단계: 영양 코치의 영양 분석 및 식단 계획 추가
-        st.markdown("### 2단계: 영양 분석 및 식단 계획 수립 중...")
-        with st.spinner("영양 코치가 식단을 분석 중입니다..."):
-            nutrition_enhanced = self.nutrition_coach.enhance(initial_assessment, service_type, input_data)
-            workflow_log["steps"].append({
-                "coach": "NutritionCoach",
-                "action": "nutrition_enhancement"
-            })
-        
         # 3단계: 피트니스 코치의 운동 계획 및 실행 전략 최적화
-        st.markdown("### 3단계: 운동 계획 및 실행 전략 최적화 중...")
-        with st.spinner("피트니스 코치가 최종 조언을 준비 중입니다..."):
-            final_advice = self.fitness_coach.finalize(nutrition_enhanced, service_type, input_data)
-            workflow_log["steps"].append({
-                "coach": "FitnessCoach",
-                "action": "finalization"
-            })
-        
-        # 워크플로우 로그 저장
-        self.workflow_logs.append(workflow_log)
+        stages = [
+            ("assessment", "HealthAssessmentCoach", "initial_assessment",
+             "### 1단계: 건강 상태 평가 및 분석 중...", "건강 평가 코치가 분석 중입니다...",
+             run_assessment),
+            ("nutrition", "NutritionCoach", "nutrition_enhancement",
+             "### 2단계: 영양 분석 및 식단 계획 수립 중...", "영양 코치가 식단을 분석 중입니다...",
+             lambda: self.nutrition_coach.enhance(results["assessment"], service_type, input_data, request_context)),
+            ("fitness", "FitnessCoach", "finalization",
+             "### 3단계: 운동 계획 및 실행 전략 최적화 중...", "피트니스 코치가 최종 조언을 준비 중입니다...",
+             lambda: self.fitness_coach.finalize(results["nutrition"], service_type, input_data, request_context)),
+        ]
+        
+        try:
+            for key, coach, action, title, spinner_text, run_stage in stages:
+                step = {"coach": coach, "action": action}
+                workflow_log["steps"].append(step)
+                
+                # 이전 단계에서 중단된 경우 남은 단계는 실행하지 않음
+                if workflow_log["status"] != "completed":
+                    self._mark_step(workflow_log, step, workflow_log["status"])
+                    continue
+                
+                try:
+                    request_context.check(self.min_stage_seconds)
+                    st.markdown(title)
+                    with st.spinner(spinner_text):
+                        progress = st.empty()
+                        started = time.monotonic()
+                        # 대기 중 화면을 갱신하여 Streamlit이 재실행/종료 요청을 감지할 수 있게 함
+                        request_context.heartbeat = lambda progress=progress, started=started: progress.caption(
+                            f"경과 시간: {time.monotonic() - started:.0f}초"
+                        )
+                        try:
+                            results[key] = run_stage()
+                        finally:
+                            progress.empty()
+                    step["status"] = "completed"
+                except RequestCancelledError as e:
+                    workflow_log["status"] = e.reason
+                    self._mark_step(workflow_log, step, e.reason)
+        except (StopException, RerunException, KeyboardInterrupt):
+            # 재실행/탭 종료 등으로 스크립트가 중단되면 진행 중인 호출과 남은 단계를 취소로 기록
+            request_context.cancel()
+            self._abort_stages(workflow_log, stages, "cancelled")
+            raise
+        except Exception as e:
+            # 할당량/인증/네트워크 등 모델 오류는 취소와 구분하여 실패로 기록
+            workflow_log["error"] = f"{type(e).__name__}: {e}"
+            self._abort_stages(workflow_log, stages, "failed")
+            raise
+        finally:
+            request_context.heartbeat = None
+            # 워크플로우 로그 저장
+            self.workflow_logs.append(workflow_log)
         
         # 각 코치별 결과를 모두 반환
-        return {
-            "assessment": initial_assessment,
-            "nutrition": nutrition_enhanced,
-            "fitness": final_advice
-        }
+        results["status"] = workflow_log["status"]
+        return results
+    
+    def _mark_step(self, workflow_log, step, reason):
+        """실행되지 못한 단계를 취소/만료/실패로 기록하고 집계"""
+        step["status"] = reason
+        workflow_log[f"{reason}_steps"] += 1
+    
+    def _abort_stages(self, workflow_log, stages, reason):
+        """진행 중이던 단계를 reason으로 기록하고 시작하지 못한 단계를 로그에 추가
+        
+        취소는 남은 단계도 취소로 집계하지만, 실패는 실제로 실패한 단계만 집계하고
+        나머지는 'skipped'로 남김
+        """
+        workflow_log["status"] = reason
+        for step in workflow_log["steps"]:
+            if "status" not in step:
+                self._mark_step(workflow_log, step, reason)
+        for _, coach, action, *_ in stages[len(workflow_log["steps"]):]:
+            step = {"coach": coach, "action": action}
+            workflow_log["steps"].append(step)
+            if reason == "failed":
+                step["status"] = "skipped"
+            else:
+                self._mark_step(workflow_log, step, reason)
 
 
 class HealthAssessmentCoach:
@@ -87,7 +257,7 @@ class HealthAssessmentCoach:
         15년간의 건강 평가 및 예방 의학 경험을 바탕으로 여러분의 건강 상태를 정확히 파악하고 목표를 설정하겠습니다.
         """
     
-    def analyze(self, service_type, input_data):
+    def analyze(self, service_type, input_data, request_context=None):
         """사용자 요청에 대한 건강 평가 및 분석 수행"""
         # 서비스 유형별 맞춤 프롬프트 생성
         if service_type == "체중 관리":
@@ -113,8 +283,7 @@ class HealthAssessmentCoach:
         """
         
         # AI 모델을 통한 응답 생성
-        response = self.model.generate_content(prompt)
-        return response.text
+        return generate_text(self.model, prompt, request_context)
     
     def _create_weight_management_prompt(self, input_data):
         return f"""
@@ -203,7 +372,7 @@ class NutritionCoach:
         12년간의 임상 영양학 및 식이요법 경험을 통해 여러분에게 효과적이고 지속 가능한 식단 계획을 제안하겠습니다.
         """
     
-    def enhance(self, previous_analysis, service_type, input_data):
+    def enhance(self, previous_analysis, service_type, input_data, request_context=None):
         """건강 평가 코치의 분석을 바탕으로 영양 관점의 조언 추가"""
         # 서비스 유형별 맞춤 프롬프트 생성
         if service_type == "체중 관리":
@@ -234,8 +403,7 @@ class NutritionCoach:
         """
         
         # AI 모델을 통한 응답 생성
-        response = self.model.generate_content(prompt)
-        return response.text
+        return generate_text(self.model, prompt, request_context)
     
     def _create_weight_nutrition_prompt(self, input_data):
         return """
@@ -298,7 +466,7 @@ class FitnessCoach:
         14년간의 운동 생리학 및 퍼스널 트레이닝 경험을 통해 여러분에게 효과적이고 안전한 운동 계획을 제안하겠습니다.
         """
     
-    def finalize(self, previous_analysis, service_type, input_data):
+    def finalize(self, previous_analysis, service_type, input_data, request_context=None):
         """건강 평가 코치와 영양 코치의 분석을 바탕으로 최종 조언 제공"""
         # 서비스 유형별 맞춤 프롬프트 생성
         if service_type == "체중 관리":
@@ -334,8 +502,7 @@ class FitnessCoach:
         """
         
         # AI 모델을 통한 응답 생성
-        response = self.model.generate_content(prompt)
-        return response.text
+        return generate_text(self.model, prompt, request_context)
     
     def _create_weight_fitness_prompt(self, input_data):
         return """
@@ -385,10 +552,598 @@ class FitnessCoach:
         """
 
 
+# ============================================================================
+# 건강 평가 단계 사전 실행 (speculative pre-warming)
+# 필수 입력이 채워진 뒤 사용자가 나머지 항목을 입력하는 동안 건강 평가를 미리 실행
+# ============================================================================
+
+# 평가 입력이 이 시간(초) 동안 바뀌지 않으면 사전 실행 시작
+SPECULATIVE_DEBOUNCE_SECONDS = 3.0
+# 세션당 사전 실행 최대 횟수 (API 사용량 상한)
+SPECULATIVE_MAX_LAUNCHES = 3
+# 사전 실행 결과의 유효 시간(초)
+SPECULATIVE_TTL_SECONDS = 600
+
+# 서비스별 건강 평가 프롬프트에 쓰이는 입력 항목 / 필수 항목 / 숫자 항목
+SPECULATIVE_FIELDS = {
+    "체중 관리": {
+        "prompt_fields": ("height", "current_weight", "target_weight", "age", "gender", "activity_level", "health_issues"),
+        "required_fields": ("height", "current_weight", "target_weight", "age", "gender"),
+        "numeric_fields": ("height", "current_weight", "target_weight", "age"),
+    },
+    "체력 향상": {
+        "prompt_fields": ("current_fitness", "fitness_goals", "age", "gender", "health_issues"),
+        "required_fields": ("current_fitness", "fitness_goals", "age", "gender"),
+        "numeric_fields": ("age",),
+    },
+    "식습관 개선": {
+        "prompt_fields": ("current_diet", "diet_goals", "diet_restrictions"),
+        "required_fields": ("current_diet", "diet_goals"),
+        "numeric_fields": (),
+    },
+    "건강 검진 결과 분석": {
+        "prompt_fields": ("blood_pressure", "blood_sugar", "cholesterol", "age", "gender", "family_history"),
+        "required_fields": ("blood_pressure", "age", "gender"),
+        "numeric_fields": ("age",),
+    },
+}
+
+
+class SpeculativeAssessmentCache:
+    """입력 중인 폼으로 건강 평가를 미리 실행하고, 정확히 같은 입력에 대해서만 결과를 재사용하는 캐시"""
+    
+    def __init__(self, debounce_seconds=SPECULATIVE_DEBOUNCE_SECONDS,
+                 max_launches=SPECULATIVE_MAX_LAUNCHES, ttl_seconds=SPECULATIVE_TTL_SECONDS):
+        self.debounce_seconds = debounce_seconds
+        self.max_launches = max_launches
+        self.ttl_seconds = ttl_seconds
+        # 사전 실행 지표: 실행 / 적중 / 진행 중 적중 / 미적중 / 낭비 / 상한 초과
+        self.metrics = {"launched": 0, "hits": 0, "in_flight_hits": 0, "misses": 0, "wasted": 0, "capped": 0}
+        self._lock = threading.Lock()
+        self._timer = None
+        self._pending_key = None
+        self._entry = None
+        # 마지막으로 분석 버튼에서 사용된 입력 (결과 화면의 재실행에서 같은 입력을 다시 사전 실행하지 않기 위함)
+        self._consumed_key = None
+    
+    def observe(self, coach_factory, service_type, input_data):
+        """폼이 다시 그려질 때마다 호출: 평가 입력이 유효하고 디바운스 시간 동안 유지되면 사전 실행"""
+        key = self._make_key(service_type, input_data)
+        with self._lock:
+            # 이미 분석한 입력이면 입력이 바뀔 때까지 사전 실행하지 않음
+            if key is not None and key == self._consumed_key:
+                return
+            self._consumed_key = None
+            if key is None:
+                self._cancel_timer()
+                return
+            # 이미 예약되었거나 실행된 입력이면 타이머를 다시 시작하지 않음
+            if key == self._pending_key or (self._entry is not None and self._entry["key"] == key):
+                return
+            self._cancel_timer()
+            self._pending_key = key
+            self._timer = threading.Timer(
+                self.debounce_seconds, self._launch,
+                args=(coach_factory, service_type, dict(input_data), key)
+            )
+            self._timer.daemon = True
+            self._timer.start()
+    
+    def take(self, service_type, input_data, request_context):
+        """분석 버튼 클릭 시 호출: 같은 입력의 유효한 사전 실행 결과를 반환하고, 없으면 None"""
+        key = self._make_key(service_type, input_data)
+        with self._lock:
+            self._cancel_timer()
+            entry, self._entry = self._entry, None
+            self._consumed_key = key
+        
+        if entry is None:
+            self._count("misses")
+            return None
+        
+        expired = entry["done"].is_set() and time.monotonic() - entry["finished"] > self.ttl_seconds
+        if entry["key"] != key or expired:
+            entry["context"].cancel()
+            self._count("misses", "wasted")
+            return None
+        
+        in_flight = not entry["done"].is_set()
+        if in_flight:
+            # 아직 실행 중이면 요청 컨텍스트의 취소/마감을 지키면서 완료를 기다림
+            try:
+                request_context.run(entry["done"].wait)
+            except RequestCancelledError:
+                entry["context"].cancel()
+                self._count("wasted")
+                raise
+        
+        if entry["result"] is None:
+            self._count("misses")
+            return None
+        
+        self._count("hits", *(["in_flight_hits"] if in_flight else []))
+        return entry["result"]
+    
+    def cancel(self):
+        """사전 실행 기능이 꺼지거나 서비스가 바뀔 때 호출: 예약된 실행과 진행 중인 실행을 모두 취소"""
+        with self._lock:
+            self._cancel_timer()
+            entry, self._entry = self._entry, None
+            if entry is not None:
+                entry["context"].cancel()
+                self.metrics["wasted"] += 1
+    
+    def metrics_snapshot(self):
+        """다른 스레드가 갱신 중인 지표의 일관된 사본 반환"""
+        with self._lock:
+            return dict(self.metrics)
+    
+    def _launch(self, coach_factory, service_type, input_data, key):
+        """디바운스 타이머 스레드에서 건강 평가를 실행"""
+        with self._lock:
+            if key != self._pending_key:
+                return
+            self._pending_key = None
+            self._timer = None
+            if self.metrics["launched"] >= self.max_launches:
+                self.metrics["capped"] += 1
+                return
+            # 다른 입력으로 실행된 이전 결과는 폐기
+            if self._entry is not None:
+                self._entry["context"].cancel()
+                self.metrics["wasted"] += 1
+            entry = {
+                "key": key,
+                "context": RequestContext(),
+                "done": threading.Event(),
+                "result": None,
+                "finished": None
+            }
+            self._entry = entry
+            self.metrics["launched"] += 1
+        
+        try:
+            entry["result"] = coach_factory().analyze(service_type, input_data, entry["context"])
+        except Exception:
+            # 사전 실행 실패는 무시하고 버튼 클릭 시 정상 경로로 다시 실행
+            entry["result"] = None
+        finally:
+            entry["finished"] = time.monotonic()
+            entry["done"].set()
+    
+    def _count(self, *names):
+        with self._lock:
+            for name in names:
+                self.metrics[name] += 1
+    
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._pending_key = None
+    
+    @staticmethod
+    def _make_key(service_type, input_data):
+        """평가 프롬프트에 쓰이는 입력 값으로 캐시 키 생성 (필수 입력이 유효하지 않으면 None)"""
+        spec = SPECULATIVE_FIELDS.get(service_type)
+        if spec is None:
+            return None
+        for field in spec["required_fields"]:
+            if not str(input_data.get(field, "")).strip():
+                return None
+        for field in spec["numeric_fields"]:
+            try:
+                float(input_data.get(field, ""))
+            except (TypeError, ValueError):
+                return None
+        return (service_type,) + tuple(input_data.get(field, "") for field in spec["prompt_fields"])
+
+
+# ============================================================================
+# 상담 기록 저장 및 전문 검색
+# 입력 정보와 세 코치의 결과를 SQLite에 저장하고 FTS5 전문 색인으로 검색
+# ============================================================================
+
+# 상담 기록 데이터베이스 경로 (환경 변수로 변경 가능)
+HISTORY_DB_PATH = os.environ.get("HEALTH_COACH_HISTORY_DB", "health_coach_history.db")
+# 검색 결과 한 페이지당 표시 건수
+HISTORY_PAGE_SIZE = 10
+# 모든 회원의 기록을 검색할 수 있는 코치 접근 코드 (설정하지 않으면 코치 검색 비활성화)
+COACH_ACCESS_CODE = os.environ.get("HEALTH_COACH_COACH_ACCESS_CODE", "")
+
+# 한글 연속 구간 또는 그 밖의 문자/숫자 연속 구간
+_TOKEN_PATTERN = re.compile(r"[가-힣]+|[^\W가-힣_]+")
+
+
+def _index_terms(text):
+    """색인/검색용 토큰 생성
+    
+    한국어는 조사와 복합어 때문에 공백 단위로는 검색이 잘 되지 않으므로
+    한글 구간은 겹치는 두 글자 단위(bigram)로 나누어 '당뇨'로 '당뇨병', '가족력당뇨'도 찾을 수 있게 함
+    """
+    terms = []
+    for token in _TOKEN_PATTERN.findall(text or ""):
+        if "가" <= token[0] <= "힣" and len(token) > 1:
+            terms.extend(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            terms.append(token.lower())
+    return terms
+
+
+def make_owner_key(api_key):
+    """기록 소유자 키: 회원별 API 키의 해시 (API 키 자체는 저장하지 않음)"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def is_coach_code(code):
+    """코치 접근 코드 확인 (코드가 설정되지 않았으면 항상 False)"""
+    if not COACH_ACCESS_CODE or not code:
+        return False
+    return hmac.compare_digest(code.encode("utf-8"), COACH_ACCESS_CODE.encode("utf-8"))
+
+
+def _owner_term(owner_key):
+    """소유자별 검색을 색인 안에서 처리하기 위해 기록마다 추가하는 소유자 토큰"""
+    return f"owner{owner_key}"
+
+
+def _build_match_query(query):
+    """사용자 검색어를 FTS5 MATCH 구문으로 변환 (모든 단어를 포함하는 기록 검색)"""
+    clauses = []
+    for word in query.split():
+        terms = _index_terms(word)
+        if not terms:
+            continue
+        if len(terms) == 1 and (len(terms[0]) == 1 or not "가" <= terms[0][0] <= "힣"):
+            # 한 글자 또는 영문/숫자는 접두어 검색
+            clauses.append(f'"{terms[0]}"*')
+        else:
+            # 여러 토큰은 순서대로 붙어 있어야 하므로 구문 검색
+            clauses.append('"' + " ".join(terms) + '"')
+    return " AND ".join(clauses)
+
+
+class ConsultationHistory:
+    """상담 기록을 저장하고 검색하는 SQLite 저장소 (호출마다 연결을 열어 여러 세션 스레드에서 안전하게 사용)
+    
+    모든 조회/삭제는 기록 소유자(owner_key)로 제한되며, 다른 회원의 기록은
+    all_members=True를 명시한 경우(코치 권한 확인 후)에만 조회할 수 있음
+    """
+    
+    def __init__(self, db_path=HISTORY_DB_PATH):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS consultations (
+                    id INTEGER PRIMARY KEY,
+                    owner_key TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    service_type TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    input_data TEXT NOT NULL,
+                    assessment TEXT,
+                    nutrition TEXT,
+                    fitness TEXT,
+                    terms TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_consultations_owner
+                    ON consultations (owner_key, id);
+                CREATE INDEX IF NOT EXISTS idx_consultations_created_at
+                    ON consultations (created_at);
+                CREATE INDEX IF NOT EXISTS idx_consultations_service
+                    ON consultations (service_type, id);
+                CREATE VIRTUAL TABLE IF NOT EXISTS consultations_fts
+                    USING fts5 (terms, content='consultations', content_rowid='id', tokenize='unicode61');
+            """)
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def save(self, owner_key, service_type, input_data, result):
+        """상담 입력과 코치별 결과를 소유자 기록으로 저장하고 새 기록의 id 반환"""
+        outputs = [result.get("assessment"), result.get("nutrition"), result.get("fitness")]
+        terms = " ".join(
+            [_owner_term(owner_key)]
+            + _index_terms(" ".join([service_type] + [str(v) for v in input_data.values()] + [o or "" for o in outputs]))
+        )
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO consultations "
+                    "(owner_key, created_at, service_type, status, input_data, assessment, nutrition, fitness, terms) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (owner_key, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), service_type,
+                     result.get("status", "completed"), json.dumps(input_data, ensure_ascii=False), *outputs, terms)
+                )
+                conn.execute(
+                    "INSERT INTO consultations_fts (rowid, terms) VALUES (?, ?)",
+                    (cursor.lastrowid, terms)
+                )
+            return cursor.lastrowid
+        finally:
+            conn.close()
+    
+    def get(self, consultation_id, owner_key, all_members=False):
+        """저장된 상담 기록 하나를 반환 (없거나 조회 권한이 없으면 None)"""
+        conn = self._connect()
+        try:
+            row = self._fetch(conn, consultation_id, owner_key, all_members)
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        record = dict(row)
+        del record["terms"]
+        record["input_data"] = json.loads(record["input_data"])
+        return record
+    
+    def delete(self, consultation_id, owner_key, all_members=False):
+        """상담 기록과 전문 색인 항목을 함께 삭제 (삭제했으면 True)"""
+        conn = self._connect()
+        try:
+            with conn:
+                row = self._fetch(conn, consultation_id, owner_key, all_members)
+                if row is None:
+                    return False
+                # 외부 콘텐츠 FTS5 테이블은 색인했던 값과 같은 값으로 'delete' 명령을 보내야 색인에서 제거됨
+                conn.execute(
+                    "INSERT INTO consultations_fts (consultations_fts, rowid, terms) VALUES ('delete', ?, ?)",
+                    (row["id"], row["terms"])
+                )
+                conn.execute("DELETE FROM consultations WHERE id = ?", (row["id"],))
+            return True
+        finally:
+            conn.close()
+    
+    def _fetch(self, conn, consultation_id, owner_key, all_members):
+        if all_members:
+            return conn.execute("SELECT * FROM consultations WHERE id = ?", (consultation_id,)).fetchone()
+        return conn.execute(
+            "SELECT * FROM consultations WHERE id = ? AND owner_key = ?", (consultation_id, owner_key)
+        ).fetchone()
+    
+    def search(self, owner_key, query="", service_type=None, since=None, before_id=None,
+               limit=HISTORY_PAGE_SIZE, all_members=False):
+        """소유자 기록 중 검색어/서비스/기간 조건으로 최신순 검색
+        
+        페이지 이동은 OFFSET 대신 이전 페이지 마지막 id(before_id)를 기준으로 하여
+        기록이 수백만 건이어도 뒤 페이지가 느려지지 않음
+        """
+        match_query = _build_match_query(query) if query else ""
+        if query and not match_query:
+            return []
+        if not all_members and match_query:
+            # 소유자 토큰을 함께 검색하여 다른 회원의 일치 항목을 색인 단계에서 제외
+            match_query = f'"{_owner_term(owner_key)}" AND {match_query}'
+        
+        conn = self._connect()
+        try:
+            conditions, params = [], []
+            if match_query:
+                id_column = "consultations_fts.rowid"
+                source = "consultations_fts JOIN consultations c ON c.id = consultations_fts.rowid"
+                conditions.append("consultations_fts MATCH ?")
+                params.append(match_query)
+            else:
+                id_column = "c.id"
+                source = "consultations c"
+            if not all_members:
+                conditions.append("c.owner_key = ?")
+                params.append(owner_key)
+            if since is not None:
+                # 기록 id는 저장 시각 순서로 증가하므로 기간 조건을 id 범위로 바꿔 색인 범위 검색에 활용
+                row = conn.execute(
+                    "SELECT id FROM consultations WHERE created_at >= ? ORDER BY created_at LIMIT 1",
+                    (since.strftime("%Y-%m-%d %H:%M:%S"),)
+                ).fetchone()
+                if row is None:
+                    return []
+                conditions.append(f"{id_column} >= ?")
+                params.append(row["id"])
+            if before_id is not None:
+                conditions.append(f"{id_column} < ?")
+                params.append(before_id)
+            if service_type:
+                conditions.append("c.service_type = ?")
+                params.append(service_type)
+            
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            rows = conn.execute(
+                f"SELECT c.id, c.owner_key, c.created_at, c.service_type, c.status, "
+                f"substr(c.assessment, 1, 120) AS preview "
+                f"FROM {source} {where} ORDER BY {id_column} DESC LIMIT ?",
+                params + [limit]
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+
 # ============================================================================
 # Streamlit 웹 애플리케이션 구현
 # ============================================================================
 
+def get_speculative_cache():
+    """세션별 건강 평가 사전 실행 캐시 반환"""
+    if "speculative_cache" not in st.session_state:
+        st.session_state["speculative_cache"] = SpeculativeAssessmentCache()
+    return st.session_state["speculative_cache"]
+
+
+def prewarm_assessment(api_key, service_type, input_data, enabled):
+    """현재 폼 입력으로 건강 평가 사전 실행을 예약
+    
+    사전 실행이 꺼져 있거나 서비스가 바뀌었으면 이미 예약/진행 중인 실행을 취소하여
+    사용자가 원하지 않는 API 호출이 나가지 않게 함
+    """
+    previous_service = st.session_state.get("speculative_service")
+    st.session_state["speculative_service"] = service_type
+    if "speculative_cache" in st.session_state and (not enabled or previous_service != service_type):
+        st.session_state["speculative_cache"].cancel()
+    
+    if enabled:
+        get_speculative_cache().observe(
+            lambda: HealthCoachTeam(api_key).assessment_coach, service_type, input_data
+        )
+
+
+@st.cache_resource
+def get_history():
+    """앱 전체에서 공유하는 상담 기록 저장소 반환"""
+    return ConsultationHistory(HISTORY_DB_PATH)
+
+
+def history_settings_panel():
+    """사이드바 상담 기록 설정: 저장 안내 및 동의, 코치 권한 확인
+    
+    반환값: (상담 기록 저장 여부, 모든 회원 기록 검색 여부)
+    """
+    st.markdown("### 💾 상담 기록")
+    st.caption(
+        "기록 저장을 켜 두면 '분석 시작' 시 입력한 건강 정보와 코치 분석 결과가 이 서버에 저장됩니다. "
+        "저장된 기록은 같은 API 키로 접속한 경우에만 검색할 수 있으며(API 키 자체는 저장하지 않음), "
+        "기록을 열어 언제든 삭제할 수 있습니다."
+    )
+    save_history = st.checkbox("상담 기록 저장", value=True)
+    
+    # 다른 회원의 기록 검색은 코치 접근 코드가 설정되어 있고 일치할 때만 허용
+    all_members = False
+    if COACH_ACCESS_CODE:
+        code = st.text_input("코치 접근 코드", type="password")
+        if code and not is_coach_code(code):
+            st.warning("코치 접근 코드가 올바르지 않습니다.")
+        elif code:
+            all_members = st.checkbox("모든 회원 기록 검색 (코치 전용)")
+    return save_history, all_members
+
+
+def history_search_panel(owner_key, all_members=False):
+    """사이드바 상담 기록 검색 패널: 검색 결과에서 선택한 기록을 다시 열 수 있음"""
+    st.markdown("### 🔍 상담 기록 검색")
+    query = st.text_input("검색어", placeholder="예: 당뇨 가족력")
+    service_filter = st.selectbox("서비스 유형", ["전체", "체중 관리", "체력 향상", "식습관 개선", "건강 검진 결과 분석"])
+    period = st.selectbox("기간", ["전체", "최근 7일", "최근 30일", "최근 1년"])
+    
+    # 검색 조건이 바뀌면 첫 페이지부터 다시 표시
+    search_key = (owner_key, all_members, query, service_filter, period)
+    if st.session_state.get("history_search_key") != search_key:
+        st.session_state["history_search_key"] = search_key
+        st.session_state["history_cursors"] = [None]
+    cursors = st.session_state["history_cursors"]
+    
+    period_days = {"최근 7일": 7, "최근 30일": 30, "최근 1년": 365}.get(period)
+    since = datetime.now() - timedelta(days=period_days) if period_days else None
+    rows = get_history().search(
+        owner_key,
+        query.strip(),
+        service_type=None if service_filter == "전체" else service_filter,
+        since=since,
+        before_id=cursors[-1],
+        limit=HISTORY_PAGE_SIZE,
+        all_members=all_members
+    )
+    
+    if not rows:
+        st.caption("검색 결과가 없습니다.")
+    for row in rows:
+        member = f" · 회원 {row['owner_key'][:8]}" if all_members else ""
+        st.caption(f"{row['created_at']} · {row['service_type']}{member}")
+        st.markdown(f"{(row['preview'] or '').strip()[:60]}...")
+        st.button("열기", key=f"open_consultation_{row['id']}",
+                  on_click=st.session_state.__setitem__, args=("opened_consultation", row["id"]))
+    
+    # 이전/다음 페이지 이동 (콜백으로 처리하여 다른 위젯 상태가 초기화되지 않게 함)
+    col1, col2 = st.columns(2)
+    with col1:
+        if len(cursors) > 1:
+            st.button("◀ 이전", key="history_prev", on_click=cursors.pop)
+    with col2:
+        if len(rows) == HISTORY_PAGE_SIZE:
+            st.button("다음 ▶", key="history_next", on_click=cursors.append, args=(rows[-1]["id"],))
+
+
+def delete_consultation(consultation_id, owner_key, all_members=False):
+    """상담 기록 삭제 버튼 콜백: 기록과 검색 색인을 함께 삭제하고 열린 기록 닫기"""
+    get_history().delete(consultation_id, owner_key, all_members)
+    st.session_state.pop("opened_consultation", None)
+    st.session_state["history_cursors"] = [None]
+
+
+def display_opened_consultation(owner_key, all_members=False):
+    """검색 패널에서 연 지난 상담 결과를 다시 생성하지 않고 표시"""
+    record = get_history().get(st.session_state["opened_consultation"], owner_key, all_members)
+    if record is None:
+        del st.session_state["opened_consultation"]
+        return
+    
+    st.subheader(f"📁 지난 상담 기록: {record['service_type']} ({record['created_at']})")
+    with st.expander("입력 정보 보기"):
+        for key, value in record["input_data"].items():
+            if value:
+                st.markdown(f"* **{key}**: {value}")
+    display_results(record)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.button("기록 닫기", on_click=st.session_state.pop, args=("opened_consultation", None))
+    with col2:
+        st.button("🗑️ 기록 삭제", on_click=delete_consultation, args=(record["id"], owner_key, all_members))
+    st.markdown("---")
+
+
+def run_consultation(api_key, service_type, input_data, speculative=False, save_history=True):
+    """이전 요청을 취소한 뒤 새 요청 컨텍스트로 코치 팀 분석을 실행하고 결과 표시"""
+    # 같은 세션에서 아직 진행 중인 이전 요청이 있으면 취소
+    previous_request = st.session_state.get("active_request")
+    if previous_request is not None:
+        previous_request.cancel()
+    
+    request_context = RequestContext()
+    st.session_state["active_request"] = request_context
+    
+    # 코치 팀 초기화
+    coach_team = HealthCoachTeam(api_key)
+    try:
+        speculative_cache = get_speculative_cache() if speculative else None
+        result = coach_team.get_health_advice(service_type, input_data, request_context, speculative_cache)
+    finally:
+        if st.session_state.get("active_request") is request_context:
+            del st.session_state["active_request"]
+    
+    # 상담 기록 저장 (저장을 선택했고 실행된 코치 단계가 하나라도 있을 때만)
+    if save_history and any(result[key] is not None for key in ("assessment", "nutrition", "fitness")):
+        try:
+            get_history().save(make_owner_key(api_key), service_type, input_data, result)
+        except sqlite3.Error as e:
+            st.caption(f"상담 기록을 저장하지 못했습니다: {e}")
+    
+    # 결과 표시
+    display_results(result)
+    return result
+
+
+def display_results(result):
+    """코치별 분석 결과 카드 표시 (실행되지 않은 단계는 생략)"""
+    st.markdown("### 📊 코치팀 분석 결과")
+    if result["status"] == "cancelled":
+        st.warning("요청이 취소되어 일부 코치 단계가 실행되지 않았습니다.")
+    elif result["status"] == "expired":
+        st.warning("처리 시간이 초과되어 일부 코치 단계가 생략되었습니다. 잠시 후 다시 시도해주세요.")
+    
+    cards = [
+        ("assessment", "assessment-coach", "김건강 평가 코치"),
+        ("nutrition", "nutrition-coach", "이영양 코치"),
+        ("fitness", "fitness-coach", "박피트니스 코치 (최종 통합 조언)"),
+    ]
+    for key, css_class, title in cards:
+        if result[key] is None:
+            continue
+        st.markdown(f"""<div class="coach-card {css_class}"><b>{title}</b><br><br>{result[key]}</div>""", unsafe_allow_html=True)
+
+
 def main():
     """Streamlit 웹 애플리케이션의 메인 로직"""
     # 페이지 기본 설정
@@ -485,9 +1240,28 @@ def main():
         if not api_key:
             st.warning("API 키를 입력해주세요.")
             st.stop()
+        # 상담 기록 소유자 키 (API 키 해시)
+        owner_key = make_owner_key(api_key)
             
         st.markdown("---")
         
+        # 건강 평가 사전 실행 (선택 기능)
+        speculative = st.checkbox(
+            "⚡ 입력 중 건강 평가 미리 실행",
+            help="필수 항목 입력이 끝나면 나머지 항목을 입력하는 동안 건강 평가를 미리 실행합니다. "
+                 f"세션당 최대 {SPECULATIVE_MAX_LAUNCHES}회까지 API를 추가로 사용할 수 있습니다."
+        )
+        if speculative:
+            metrics = get_speculative_cache().metrics_snapshot()
+            st.caption(
+                f"사전 실행 {metrics['launched']}/{SPECULATIVE_MAX_LAUNCHES}회 · "
+                f"상한 초과 {metrics['capped']}회 · "
+                f"적중 {metrics['hits']}회 (실행 중 적중 {metrics['in_flight_hits']}회) · "
+                f"미적중 {metrics['misses']}회 · 낭비 {metrics['wasted']}회"
+            )
+        
+        st.markdown("---")
+        
         # 코치 소개
         st.markdown("### 🧠 코치 소개")
         
@@ -527,6 +1301,11 @@ def main():
             * 경력: 스포츠 의학 센터, 엘리트 퍼포먼스 코치, 온라인 피트니스 플랫폼 디렉터
             """)
             
+        st.markdown("---")
+        # 상담 기록 저장 안내 및 검색
+        save_history, all_members = history_settings_panel()
+        history_search_panel(owner_key, all_members)
+        
         st.markdown("---")
         # 사용 방법 안내
         st.markdown("### ℹ️ 사용 방법")
@@ -536,8 +1315,13 @@ def main():
         3. 필요한 정보를 입력하세요
         4. '분석 시작' 버튼을 클릭하면 3명의 코치가 순차적으로 분석합니다
         5. 최종 조언을 확인하세요
+        6. '상담 기록 검색'에서 내 지난 상담 결과를 다시 열어보거나 삭제할 수 있습니다
         """)
     
+    # 검색 패널에서 연 지난 상담 기록 표시
+    if "opened_consultation" in st.session_state:
+        display_opened_consultation(owner_key, all_members)
+    
     # 서비스 선택 드롭다운
     service = st.selectbox(
         "원하는 서비스를 선택하세요",
@@ -575,33 +1359,27 @@ def main():
         diet_restrictions = st.text_area("식이 제한사항(알레르기, 식단 유형 등)", height=100)
         exercise_history = st.text_area("운동 경험", height=100)
         
+        # 입력 데이터 구성
+        input_data = {
+            "height": height,
+            "current_weight": current_weight,
+            "target_weight": target_weight,
+            "age": age,
+            "gender": gender,
+            "activity_level": activity_level,
+            "health_issues": health_issues,
+            "diet_restrictions": diet_restrictions,
+            "exercise_history": exercise_history
+        }
+        
+        # 필수 입력이 채워지면 나머지 항목을 입력하는 동안 건강 평가를 미리 실행 (꺼지면 예약 취소)
+        prewarm_assessment(api_key, "체중 관리", input_data, speculative)
+        
         # 분석 시작 버튼
         if st.button("분석 시작"):
             if height and current_weight and target_weight and age and gender:
-                # 코치 팀 초기화
-                coach_team = HealthCoachTeam(api_key)
-                
-                # 입력 데이터 구성
-                input_data = {
-                    "height": height,
-                    "current_weight": current_weight,
-                    "target_weight": target_weight,
-                    "age": age,
-                    "gender": gender,
-                    "activity_level": activity_level,
-                    "health_issues": health_issues,
-                    "diet_restrictions": diet_restrictions,
-                    "exercise_history": exercise_history
-                }
-                
-                # 결과 처리
-                result = coach_team.get_health_advice("체중 관리", input_data)
-                
-                # 결과 표시
-                st.markdown("### 📊 코치팀 분석 결과")
-                st.markdown(f"""<div class="coach-card assessment-coach"><b>김건강 평가 코치</b><br><br>{result['assessment']}</div>""", unsafe_allow_html=True)
-                st.markdown(f"""<div class="coach-card nutrition-coach"><b>이영양 코치</b><br><br>{result['nutrition']}</div>""", unsafe_allow_html=True)
-                st.markdown(f"""<div class="coach-card fitness-coach"><b>박피트니스 코치 (최종 통합 조언)</b><br><br>{result['fitness']}</div>""", unsafe_allow_html=True)
+                # 결과 처리 및 표시
+                run_consultation(api_key, "체중 관리", input_data, speculative, save_history)
             else:
                 st.warning("필수 정보를 모두 입력해주세요.")
                 
@@ -620,25 +1398,22 @@ def main():
         training_frequency = st.selectbox("주당 운동 가능 횟수", ["1-2회", "3-4회", "5회 이상"])
         health_issues = st.text_area("건강 이슈 또는 제한사항", height=100)
         
+        input_data = {
+            "current_fitness": current_fitness,
+            "fitness_goals": fitness_goals,
+            "age": age,
+            "gender": gender,
+            "exercise_type": exercise_type,
+            "training_frequency": training_frequency,
+            "health_issues": health_issues,
+        }
+        
+        # 필수 입력이 채워지면 나머지 항목을 입력하는 동안 건강 평가를 미리 실행 (꺼지면 예약 취소)
+        prewarm_assessment(api_key, "체력 향상", input_data, speculative)
+        
         if st.button("체력 계획 생성"):
             if current_fitness and fitness_goals and age and gender:
-                coach_team = HealthCoachTeam(api_key)
-                input_data = {
-                    "current_fitness": current_fitness,
-                    "fitness_goals": fitness_goals,
-                    "age": age,
-                    "gender": gender,
-                    "exercise_type": exercise_type,
-                    "training_frequency": training_frequency,
-                    "health_issues": health_issues,
-                }
-                
-                result = coach_team.get_health_advice("체력 향상", input_data)
-                
-                st.markdown("### 📊 코치팀 분석 결과")
-                st.markdown(f"""<div class="coach-card assessment-coach"><b>김건강 평가 코치</b><br><br>{result['assessment']}</div>""", unsafe_allow_html=True)
-                st.markdown(f"""<div class="coach-card nutrition-coach"><b>이영양 코치</b><br><br>{result['nutrition']}</div>""", unsafe_allow_html=True)
-                st.markdown(f"""<div class="coach-card fitness-coach"><b>박피트니스 코치 (최종 통합 조언)</b><br><br>{result['fitness']}</div>""", unsafe_allow_html=True)
+                run_consultation(api_key, "체력 향상", input_data, speculative, save_history)
             else:
                 st.warning("필수 정보를 모두 입력해주세요.")
     
@@ -659,26 +1434,23 @@ def main():
         diet_restrictions = st.text_area("식이 제한사항(알레르기, 종교적 이유 등)", height=100)
         health_issues = st.text_area("건강 이슈", height=100)
         
+        input_data = {
+            "current_diet": current_diet,
+            "diet_goals": diet_goals,
+            "age": age,
+            "gender": gender,
+            "activity_level": activity_level,
+            "eating_environment": eating_environment,
+            "diet_restrictions": diet_restrictions,
+            "health_issues": health_issues
+        }
+        
+        # 필수 입력이 채워지면 나머지 항목을 입력하는 동안 건강 평가를 미리 실행 (꺼지면 예약 취소)
+        prewarm_assessment(api_key, "식습관 개선", input_data, speculative)
+        
         if st.button("식습관 개선 계획 생성"):
             if current_diet and diet_goals and age and gender:
-                coach_team = HealthCoachTeam(api_key)
-                input_data = {
-                    "current_diet": current_diet,
-                    "diet_goals": diet_goals,
-                    "age": age,
-                    "gender": gender,
-                    "activity_level": activity_level,
-                    "eating_environment": eating_environment,
-                    "diet_restrictions": diet_restrictions,
-                    "health_issues": health_issues
-                }
-                
-                result = coach_team.get_health_advice("식습관 개선", input_data)
-                
-                st.markdown("### 📊 코치팀 분석 결과")
-                st.markdown(f"""<div class="coach-card assessment-coach"><b>김건강 평가 코치</b><br><br>{result['assessment']}</div>""", unsafe_allow_html=True)
-                st.markdown(f"""<div class="coach-card nutrition-coach"><b>이영양 코치</b><br><br>{result['nutrition']}</div>""", unsafe_allow_html=True)
-                st.markdown(f"""<div class="coach-card fitness-coach"><b>박피트니스 코치 (최종 통합 조언)</b><br><br>{result['fitness']}</div>""", unsafe_allow_html=True)
+                run_consultation(api_key, "식습관 개선", input_data, speculative, save_history)
             else:
                 st.warning("필수 정보를 모두 입력해주세요.")
     
@@ -698,26 +1470,23 @@ def main():
         other_results = st.text_area("기타 검사 결과 및 의사 소견", height=100)
         health_issues = st.text_area("현재 건강 이슈 또는 증상", height=100)
         
+        input_data = {
+            "blood_pressure": blood_pressure,
+            "blood_sugar": blood_sugar,
+            "cholesterol": cholesterol,
+            "other_results": other_results,
+            "age": age,
+            "gender": gender,
+            "family_history": family_history,
+            "health_issues": health_issues
+        }
+        
+        # 필수 입력이 채워지면 나머지 항목을 입력하는 동안 건강 평가를 미리 실행 (꺼지면 예약 취소)
+        prewarm_assessment(api_key, "건강 검진 결과 분석", input_data, speculative)
+        
         if st.button("건강 검진 결과 분석"):
             if blood_pressure and age and gender:
-                coach_team = HealthCoachTeam(api_key)
-                input_data = {
-                    "blood_pressure": blood_pressure,
-                    "blood_sugar": blood_sugar,
-                    "cholesterol": cholesterol,
-                    "other_results": other_results,
-                    "age": age,
-                    "gender": gender,
-                    "family_history": family_history,
-                    "health_issues": health_issues
-                }
-                
-                result = coach_team.get_health_advice("건강 검진 결과 분석", input_data)
-                
-                st.markdown("### 📊 코치팀 분석 결과")
-                st.markdown(f"""<div class="coach-card assessment-coach"><b>김건강 평가 코치</b><br><br>{result['assessment']}</div>""", unsafe_allow_html=True)
-                st.markdown(f"""<div class="coach-card nutrition-coach"><b>이영양 코치</b><br><br>{result['nutrition']}</div>""", unsafe_allow_html=True)
-                st.markdown(f"""<div class="coach-card fitness-coach"><b>박피트니스 코치 (최종 통합 조언)</b><br><br>{result['fitness']}</div>""", unsafe_allow_html=True)
+                run_consultation(api_key, "건강 검진 결과 분석", input_data, speculative, save_history)
             else:
                 st.warning("최소한 혈압, 나이, 성별을 입력해주세요.")
 
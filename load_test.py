@@ -0,0 +1,449 @@
+# 필요한 라이브러리 임포트
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# ============================================================================
+# 헬스 케어 코치 앱 동시 접속 부하 테스트
+# Streamlit AppTest로 실제 health_care_coach.py 스크립트를 여러 세션에서 동시에 실행하고,
+# 로컬 가짜 모델로 Gemini 호출을 대체하여 API 비용 없이 컨테이너 수용 능력을 측정
+#
+# 사용 예:
+#   python load_test.py --levels 1,2,4,8,16 --label v1.3.0
+#
+# 각 동시 세션 수(level)는 별도 프로세스에서 실행되어 최대 RSS가 서로 섞이지 않으며,
+# 결과는 --output 파일에 한 줄(JSON)씩 추가되어 릴리스별 용량 곡선을 비교할 수 있음
+# 참고: AppTest는 Streamlit 서버(웹소켓/세션 관리) 계층 없이 스크립트 재실행만 수행하므로
+#       측정값은 스크립트 실행, 스레드 경합, 메모리 측면의 수용 능력에 해당
+# ============================================================================
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "health_care_coach.py")
+
+# 가짜 모델이 반환하는 응답 (실제 응답과 비슷한 길이의 한국어 텍스트)
+FAKE_RESPONSE_PARAGRAPH = (
+    "현재 입력하신 정보를 바탕으로 건강 상태를 평가한 결과, 전반적인 상태는 양호하나 "
+    "몇 가지 관리가 필요한 위험 요소가 확인됩니다. 규칙적인 식사와 충분한 수면, "
+    "주 3회 이상의 유산소 운동과 주 2회의 근력 운동을 권장합니다.\n\n"
+)
+FAKE_RESPONSE_REPEAT = 12
+
+# 작업자가 세션 번호를 넣어 두는 AppTest 세션 상태 키 (가짜 모델 응답 시간을 세션마다 다르게 하기 위함)
+SESSION_INDEX_KEY = "_load_test_session_index"
+
+# 서비스별 시뮬레이션 시나리오: (위젯 종류, 라벨, 입력 값) 목록과 분석 버튼 라벨
+SCENARIOS = {
+    "체중 관리": {
+        "fields": [
+            ("text_input", "키(cm)", "172"),
+            ("text_input", "현재 체중(kg)", "82"),
+            ("text_input", "목표 체중(kg)", "72"),
+            ("text_input", "나이", "38"),
+            ("selectbox", "성별", "남성"),
+            ("selectbox", "활동 수준", "가벼운 활동"),
+            ("text_area", "건강 이슈 또는 특이사항", "무릎 통증이 가끔 있음"),
+            ("text_area", "식이 제한사항(알레르기, 식단 유형 등)", "유제품 알레르기"),
+            ("text_area", "운동 경험", "주 1회 등산"),
+        ],
+        "button": "분석 시작",
+    },
+    "체력 향상": {
+        "fields": [
+            ("text_area", "현재 체력 상태", "계단을 오르면 숨이 참"),
+            ("text_area", "체력 향상 목표", "3개월 안에 5km 완주"),
+            ("text_input", "나이", "29"),
+            ("selectbox", "성별", "여성"),
+            ("selectbox", "선호하는 운동 유형", "유산소"),
+            ("selectbox", "주당 운동 가능 횟수", "3-4회"),
+            ("text_area", "건강 이슈 또는 제한사항", "없음"),
+        ],
+        "button": "체력 계획 생성",
+    },
+    "식습관 개선": {
+        "fields": [
+            ("text_area", "현재 식습관 설명", "아침을 거르고 저녁에 배달 음식을 자주 먹음"),
+            ("text_area", "식습관 개선 목표", "야식 줄이기와 채소 섭취 늘리기"),
+            ("text_input", "나이", "45"),
+            ("selectbox", "성별", "남성"),
+            ("selectbox", "활동 수준", "거의 움직이지 않음"),
+            ("selectbox", "주요 식사 환경", "배달 위주"),
+            ("text_area", "식이 제한사항(알레르기, 종교적 이유 등)", "갑각류 알레르기"),
+            ("text_area", "건강 이슈", "역류성 식도염"),
+        ],
+        "button": "식습관 개선 계획 생성",
+    },
+    "건강 검진 결과 분석": {
+        "fields": [
+            ("text_input", "혈압(mmHg, 예: 120/80)", "135/88"),
+            ("text_input", "혈당(mg/dL)", "112"),
+            ("text_area", "콜레스테롤 수치", "총 콜레스테롤 235, LDL 150"),
+            ("text_input", "나이", "52"),
+            ("selectbox", "성별", "여성"),
+            ("text_area", "관련 가족력", "아버지 당뇨, 어머니 고혈압"),
+            ("text_area", "기타 검사 결과 및 의사 소견", "공복혈당장애 소견"),
+            ("text_area", "현재 건강 이슈 또는 증상", "피로감"),
+        ],
+        "button": "건강 검진 결과 분석",
+    },
+}
+
+
+# ============================================================================
+# 로컬 가짜 모델
+# ============================================================================
+
+class FakeResponse:
+    """generate_content 응답 객체를 흉내 내는 클래스"""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Gemini 대신 지정된 지연 시간 후 고정 텍스트를 반환하는 가짜 모델"""
+
+    latency = 2.0  # 호출당 평균 응답 시간(초)
+    seed = 0  # 응답 시간 흔들림을 재현하기 위한 시드
+
+    def __init__(self, model_name=None, **kwargs):
+        self.model_name = model_name
+        # 코치 모델은 세션의 스크립트 스레드에서 만들어지므로 이때 세션 번호를 읽어 둠
+        # (실제 호출은 요청 컨텍스트의 작업 스레드에서 실행되어 세션 상태에 접근할 수 없음)
+        self.session_index = current_session_index()
+
+    def generate_content(self, prompt, **kwargs):
+        # 실제 모델처럼 ±20% 범위에서 응답 시간이 흔들리도록 함
+        # 스레드 실행 순서와 무관하게 재현되도록 시드, 세션 번호, 프롬프트로 난수 생성기를 만듦
+        # (같은 시나리오 프롬프트를 보내는 세션끼리도 응답 시간이 달라짐)
+        rng = random.Random(f"{self.seed}:{self.session_index}:{prompt}")
+        time.sleep(max(0.0, rng.gauss(self.latency, self.latency * 0.2)))
+        return FakeResponse(FAKE_RESPONSE_PARAGRAPH * FAKE_RESPONSE_REPEAT)
+
+
+def current_session_index():
+    """현재 스크립트 실행 중인 AppTest 세션의 번호 (스크립트 스레드 밖이면 None)"""
+    import streamlit as st
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None
+    return st.session_state.get(SESSION_INDEX_KEY)
+
+
+def install_fake_model(latency, seed=0):
+    """google.generativeai 모듈의 모델과 설정 함수를 가짜 구현으로 교체"""
+    import google.generativeai as genai
+
+    FakeGenerativeModel.latency = latency
+    FakeGenerativeModel.seed = seed
+    genai.GenerativeModel = FakeGenerativeModel
+    genai.configure = lambda **kwargs: None
+
+
+def install_shared_runtime():
+    """여러 AppTest 세션이 실제 서버처럼 하나의 런타임과 스크립트 캐시를 공유하도록 설정
+
+    AppTest는 실행할 때마다 전역 Runtime 인스턴스를 교체하고 종료 시 비우므로,
+    여러 스레드에서 동시에 실행하면 다른 세션이 'Runtime hasn't been created!' 오류로 실패함
+    또한 재실행마다 새 ScriptCache로 스크립트를 다시 컴파일하는데, 실제 서버는 캐시를 공유하며
+    동시 컴파일은 Python 3.11에서 AST 생성 오류를 일으킬 수 있음
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import local_script_runner
+
+    shared_runtime = MagicMock(spec=Runtime)
+    shared_runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared_runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: shared_runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+
+    shared_script_cache = ScriptCache()
+    local_script_runner.ScriptCache = lambda: shared_script_cache
+
+    # AppTest는 실행 중에만 config.get_option을 바꿔 'global.appTest'를 켜는데, 여러 스레드가 동시에
+    # 바꾸고 되돌리면 일부 실행에서 꺼진 상태가 되어 selectbox 상태 조회가 KeyError로 실패하므로 전역으로 켬
+    config.set_option("global.appTest", True)
+
+    # 스크립트 스레드 밖에서 위젯을 조작할 때 나오는 경고는 부하 테스트와 무관하므로 숨김
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+
+
+# ============================================================================
+# 메모리 측정
+# ============================================================================
+
+def peak_rss_mb():
+    """현재 프로세스의 최대 RSS(MB)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS는 바이트, Linux는 KB 단위로 보고함
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def current_rss_mb():
+    """현재 프로세스의 RSS(MB), 측정할 수 없으면 최대 RSS로 대체"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def percentile(values, pct):
+    """정렬된 값 목록에서 선형 보간 백분위수 계산"""
+    if not values:
+        return None
+    values = sorted(values)
+    rank = (len(values) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+# ============================================================================
+# 세션 시뮬레이션
+# ============================================================================
+
+def find_widget(at, kind, label):
+    """AppTest에서 라벨로 위젯 검색"""
+    for widget in getattr(at, kind):
+        if widget.label == label:
+            return widget
+    raise LookupError(f"{kind} '{label}' 위젯을 찾을 수 없습니다.")
+
+
+def think(think_time, rng):
+    """사용자가 입력을 고민하는 시간 (평균 think_time초, ±50%)"""
+    if think_time > 0:
+        time.sleep(rng.uniform(0.5, 1.5) * think_time)
+
+
+def simulate_session(service, think_time, run_timeout, rng, session_index=0):
+    """한 명의 사용자가 API 키 입력부터 분석 결과 확인까지 진행하는 과정을 시뮬레이션"""
+    from streamlit.testing.v1 import AppTest
+
+    scenario = SCENARIOS[service]
+    record = {"service": service, "rerun_latencies": [], "analyze_latency": None, "error": None}
+    started = time.perf_counter()
+
+    def rerun(at):
+        begin = time.perf_counter()
+        at.run(timeout=run_timeout)
+        record["rerun_latencies"].append(time.perf_counter() - begin)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+
+    try:
+        at = AppTest.from_file(APP_PATH, default_timeout=run_timeout)
+        at.session_state[SESSION_INDEX_KEY] = session_index
+        rerun(at)
+
+        think(think_time, rng)
+        at.sidebar.text_input[0].input("load-test-key")
+        rerun(at)
+
+        think(think_time, rng)
+        find_widget(at, "selectbox", "원하는 서비스를 선택하세요").select(service)
+        rerun(at)
+
+        # 실제 브라우저처럼 입력 항목마다 재실행 발생
+        for kind, label, value in scenario["fields"]:
+            think(think_time, rng)
+            widget = find_widget(at, kind, label)
+            if kind == "selectbox":
+                widget.select(value)
+            else:
+                widget.input(value)
+            rerun(at)
+
+        think(think_time, rng)
+        find_widget(at, "button", scenario["button"]).click()
+        begin = time.perf_counter()
+        at.run(timeout=run_timeout)
+        record["analyze_latency"] = time.perf_counter() - begin
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+        if not any("코치팀 분석 결과" in md.value for md in at.markdown):
+            raise RuntimeError("분석 결과가 표시되지 않았습니다.")
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+
+    record["duration"] = time.perf_counter() - started
+    return record
+
+
+def run_level(sessions, think_time, model_latency, run_timeout, seed):
+    """지정된 수의 세션을 동시에 실행하고 처리량, 지연 시간, 메모리 지표를 반환"""
+    # 부하 테스트 상담 기록이 실제 기록 데이터베이스에 섞이지 않도록 임시 디렉터리를 쓰고 단계가 끝나면 삭제
+    with tempfile.TemporaryDirectory() as history_dir:
+        os.environ["HEALTH_COACH_HISTORY_DB"] = os.path.join(history_dir, "history.db")
+        try:
+            return measure_level(sessions, think_time, model_latency, run_timeout, seed)
+        finally:
+            # AppTest 모듈이 임포트 시 만드는 임시 디렉터리는 풀 작업 프로세스가 os._exit로 끝나면
+            # 정리되지 않으므로 직접 삭제
+            from streamlit.testing.v1 import app_test
+            app_test.TMP_DIR.cleanup()
+
+
+def measure_level(sessions, think_time, model_latency, run_timeout, seed):
+    """run_level의 실제 측정 (세션마다 seed + 번호로 만든 난수 생성기를 써서 --seed로 재현 가능)"""
+    install_fake_model(model_latency, seed)
+    install_shared_runtime()
+    # AppTest 임포트 비용을 기준 메모리에 포함
+    from streamlit.testing.v1 import AppTest  # noqa: F401
+
+    baseline_rss = current_rss_mb()
+    services = list(SCENARIOS)
+    records = []
+    lock = threading.Lock()
+    peak_threads = threading.active_count()
+    stop_sampling = threading.Event()
+
+    def sample_threads():
+        nonlocal peak_threads
+        while not stop_sampling.wait(0.1):
+            peak_threads = max(peak_threads, threading.active_count())
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        # 세션 시작 시점을 분산시켜 실제 접속 패턴에 가깝게 함
+        time.sleep(rng.uniform(0, think_time))
+        record = simulate_session(services[index % len(services)], think_time, run_timeout, rng, index)
+        with lock:
+            records.append(record)
+
+    sampler = threading.Thread(target=sample_threads, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - started
+    stop_sampling.set()
+
+    completed = [r for r in records if r["error"] is None]
+    analyze = [r["analyze_latency"] for r in completed]
+    reruns = [latency for r in records for latency in r["rerun_latencies"]]
+    peak_rss = peak_rss_mb()
+
+    return {
+        "sessions": sessions,
+        "completed": len(completed),
+        "errors": [r["error"] for r in records if r["error"] is not None],
+        "wall_time_s": round(wall_time, 3),
+        "throughput_sessions_per_min": round(len(completed) / wall_time * 60, 3),
+        "analyze_latency_s": {
+            f"p{p}": round(percentile(analyze, p), 3) if analyze else None
+            for p in (50, 90, 95, 99)
+        },
+        "rerun_latency_s": {
+            f"p{p}": round(percentile(reruns, p), 3) if reruns else None
+            for p in (50, 95, 99)
+        },
+        "baseline_rss_mb": round(baseline_rss, 1),
+        "peak_rss_mb": round(peak_rss, 1),
+        "per_session_mb": round((peak_rss - baseline_rss) / sessions, 2),
+        "peak_threads": peak_threads,
+    }
+
+
+# ============================================================================
+# 실행 및 결과 보고
+# ============================================================================
+
+def run_level_isolated(sessions, think_time, model_latency, run_timeout, seed):
+    """최대 RSS가 이전 단계의 영향을 받지 않도록 새 프로세스에서 한 단계를 실행"""
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(run_level, (sessions, think_time, model_latency, run_timeout, seed))
+
+
+def default_label():
+    """릴리스 라벨 기본값: 현재 git 커밋 해시 (없으면 'dev')"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(APP_PATH), capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "dev"
+
+
+def print_report(levels):
+    """동시 세션 수별 용량 곡선 표 출력"""
+    header = f"{'세션':>6} {'완료':>6} {'처리량/분':>10} {'p50(s)':>8} {'p95(s)':>8} {'p99(s)':>8} {'최대RSS(MB)':>12} {'세션당(MB)':>11}"
+    print(header)
+    print("-" * len(header))
+    for level in levels:
+        latency = level["analyze_latency_s"]
+        print(
+            f"{level['sessions']:>6} {level['completed']:>6} {level['throughput_sessions_per_min']:>10} "
+            f"{latency['p50'] or '-':>8} {latency['p95'] or '-':>8} {latency['p99'] or '-':>8} "
+            f"{level['peak_rss_mb']:>12} {level['per_session_mb']:>11}"
+        )
+        for error in level["errors"][:3]:
+            print(f"       오류: {error}")
+
+
+def main():
+    """명령행 인자를 읽어 단계별 부하 테스트를 실행하고 결과를 기록"""
+    parser = argparse.ArgumentParser(description="헬스 케어 코치 앱 동시 세션 부하 테스트")
+    parser.add_argument("--levels", default="1,2,4,8,16",
+                        help="쉼표로 구분한 동시 세션 수 목록 (기본값: 1,2,4,8,16)")
+    parser.add_argument("--think-time", type=float, default=1.0,
+                        help="입력 사이 평균 사용자 대기 시간(초)")
+    parser.add_argument("--model-latency", type=float, default=2.0,
+                        help="가짜 모델의 호출당 평균 응답 시간(초)")
+    parser.add_argument("--run-timeout", type=float, default=120.0,
+                        help="스크립트 재실행 한 번의 최대 시간(초)")
+    parser.add_argument("--seed", type=int, default=0, help="난수 시드")
+    parser.add_argument("--label", default=None, help="결과에 기록할 릴리스 라벨 (기본값: git 커밋 해시)")
+    parser.add_argument("--output", default="load_test_results.jsonl",
+                        help="용량 곡선을 추가 기록할 JSON Lines 파일")
+    args = parser.parse_args()
+
+    levels = []
+    for sessions in [int(n) for n in args.levels.split(",") if n.strip()]:
+        print(f"동시 세션 {sessions}개 실행 중...", flush=True)
+        levels.append(run_level_isolated(
+            sessions, args.think_time, args.model_latency, args.run_timeout, args.seed
+        ))
+
+    print()
+    print_report(levels)
+
+    run_record = {
+        "label": args.label or default_label(),
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "think_time_s": args.think_time,
+        "model_latency_s": args.model_latency,
+        "levels": levels,
+    }
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run_record, ensure_ascii=False) + "\n")
+    print(f"\n결과를 {args.output}에 기록했습니다.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import health_care_coach  # noqa: E402
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """generate_content 호출을 기록하고 지정된 지연 후 응답하는 테스트용 모델"""
+
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = []
+        self.finished = threading.Event()
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls.append((prompt, kwargs))
+        time.sleep(self.delay)
+        self.finished.set()
+        if self.error is not None:
+            raise self.error
+        return StubResponse(f"응답{len(self.calls)}")
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(health_care_coach, "CANCEL_POLL_INTERVAL", 0.01)
+
+
+@pytest.fixture
+def make_team():
+    """모든 코치가 주어진 스텁 모델을 쓰는 HealthCoachTeam 생성"""
+
+    def factory(model):
+        team = health_care_coach.HealthCoachTeam("test-key")
+        for coach in (team.assessment_coach, team.nutrition_coach, team.fitness_coach):
+            coach.model = model
+        team.min_stage_seconds = 0
+        return team
+
+    return factory
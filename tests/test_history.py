@@ -0,0 +1,94 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from health_care_coach import ConsultationHistory, _build_match_query, _index_terms, make_owner_key
+
+ALICE = make_owner_key("alice-key")
+BOB = make_owner_key("bob-key")
+
+
+def consultation(assessment):
+    return {"assessment": assessment, "nutrition": "식단 조언", "fitness": "운동 조언", "status": "completed"}
+
+
+@pytest.fixture
+def history(tmp_path):
+    return ConsultationHistory(str(tmp_path / "history.db"))
+
+
+def fts_rowids(history, match_query):
+    with sqlite3.connect(history.db_path) as conn:
+        rows = conn.execute(
+            "SELECT rowid FROM consultations_fts WHERE consultations_fts MATCH ?", (match_query,)
+        ).fetchall()
+    return [row[0] for row in rows]
+
+
+def test_index_terms_split_hangul_into_bigrams():
+    assert _index_terms("당뇨병 가족력 BMI 27") == ["당뇨", "뇨병", "가족", "족력", "bmi", "27"]
+
+
+def test_build_match_query():
+    assert _build_match_query("당뇨 가족력") == '"당뇨" AND "가족 족력"'
+    # 한 글자 한글과 영문/숫자는 접두어 검색
+    assert _build_match_query("혈 BMI") == '"혈"* AND "bmi"*'
+    assert _build_match_query("!!") == ""
+
+
+def test_partial_word_matches_longer_word(history):
+    history.save(ALICE, "건강 검진 결과 분석", {"family_history": "당뇨병"}, consultation("공복 혈당 관리 필요"))
+    history.save(ALICE, "체중 관리", {"family_history": ""}, consultation("체중 감량 계획"))
+
+    rows = history.search(ALICE, "당뇨")
+
+    assert [row["service_type"] for row in rows] == ["건강 검진 결과 분석"]
+    assert history.search(ALICE, "혈당 관리")[0]["preview"] == "공복 혈당 관리 필요"
+    assert history.search(ALICE, "고혈압") == []
+
+
+def test_search_and_get_are_scoped_to_owner(history):
+    alice_id = history.save(ALICE, "체중 관리", {"health_issues": "당뇨"}, consultation("앨리스 평가"))
+    bob_id = history.save(BOB, "체중 관리", {"health_issues": "당뇨"}, consultation("밥 평가"))
+
+    assert [row["id"] for row in history.search(ALICE)] == [alice_id]
+    assert [row["id"] for row in history.search(ALICE, "당뇨")] == [alice_id]
+    assert history.get(bob_id, ALICE) is None
+    assert history.get(alice_id, ALICE)["input_data"] == {"health_issues": "당뇨"}
+
+
+def test_all_members_search_includes_other_owners(history):
+    alice_id = history.save(ALICE, "체중 관리", {"health_issues": "당뇨"}, consultation("앨리스 평가"))
+    bob_id = history.save(BOB, "체중 관리", {"health_issues": "당뇨"}, consultation("밥 평가"))
+
+    rows = history.search(ALICE, "당뇨", all_members=True)
+
+    assert [row["id"] for row in rows] == [bob_id, alice_id]
+    assert history.get(bob_id, ALICE, all_members=True)["owner_key"] == BOB
+
+
+def test_delete_removes_row_and_index_entry(history):
+    consultation_id = history.save(ALICE, "체중 관리", {"health_issues": "당뇨"}, consultation("평가"))
+    assert fts_rowids(history, '"당뇨"') == [consultation_id]
+
+    # 다른 회원은 삭제할 수 없음
+    assert history.delete(consultation_id, BOB) is False
+    assert history.delete(consultation_id, ALICE) is True
+
+    assert history.get(consultation_id, ALICE) is None
+    assert fts_rowids(history, '"당뇨"') == []
+    # 외부 콘텐츠 테이블과 색인이 어긋나면 integrity-check가 오류를 발생시킴
+    with sqlite3.connect(history.db_path) as conn:
+        conn.execute("INSERT INTO consultations_fts (consultations_fts) VALUES ('integrity-check')")
+
+
+def test_pagination_and_period_filter(history):
+    ids = [history.save(ALICE, "체력 향상", {}, consultation(f"평가 {n}")) for n in range(5)]
+
+    first_page = history.search(ALICE, limit=2)
+    second_page = history.search(ALICE, before_id=first_page[-1]["id"], limit=2)
+
+    assert [row["id"] for row in first_page + second_page] == ids[::-1][:4]
+    assert history.search(ALICE, since=datetime.now() + timedelta(days=1)) == []
+    assert len(history.search(ALICE, since=datetime.now() - timedelta(days=1))) == 5
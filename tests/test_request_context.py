@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+from health_care_coach import RequestCancelledError, RequestContext
+from conftest import StubModel
+
+
+def test_check_raises_cancelled_after_cancel():
+    context = RequestContext()
+    context.check()
+    context.cancel()
+    with pytest.raises(RequestCancelledError) as excinfo:
+        context.check()
+    assert excinfo.value.reason == "cancelled"
+
+
+def test_check_raises_expired_when_remaining_time_is_too_short():
+    context = RequestContext(timeout=5)
+    context.check(1)
+    with pytest.raises(RequestCancelledError) as excinfo:
+        context.check(10)
+    assert excinfo.value.reason == "expired"
+
+
+def test_completed_pipeline_passes_deadline_to_model(make_team):
+    model = StubModel()
+    team = make_team(model)
+
+    result = team.get_health_advice("체중 관리", {}, RequestContext(timeout=60))
+
+    assert result == {"assessment": "응답1", "nutrition": "응답2", "fitness": "응답3", "status": "completed"}
+    assert all(0 < kwargs["request_options"]["timeout"] <= 60 for _, kwargs in model.calls)
+    log = team.workflow_logs[-1]
+    assert [step["status"] for step in log["steps"]] == ["completed"] * 3
+    assert (log["cancelled_steps"], log["expired_steps"], log["failed_steps"]) == (0, 0, 0)
+
+
+def test_cancel_abandons_in_flight_call_and_skips_later_stages(make_team):
+    model = StubModel(delay=0.5)
+    team = make_team(model)
+    context = RequestContext()
+    threading.Timer(0.1, context.cancel).start()
+
+    result = team.get_health_advice("체중 관리", {}, context)
+
+    # 첫 번째 호출이 끝나기 전에 결과를 포기하고 반환
+    assert not model.finished.is_set()
+    assert result == {"assessment": None, "nutrition": None, "fitness": None, "status": "cancelled"}
+    assert len(model.calls) == 1
+    log = team.workflow_logs[-1]
+    assert [step["status"] for step in log["steps"]] == ["cancelled"] * 3
+    assert log["cancelled_steps"] == 3
+
+
+def test_stage_is_skipped_when_remaining_time_cannot_cover_it(make_team):
+    model = StubModel(delay=0.2)
+    team = make_team(model)
+    team.min_stage_seconds = 0.5
+
+    result = team.get_health_advice("체중 관리", {}, RequestContext(timeout=0.8))
+
+    assert result["status"] == "expired"
+    assert result["assessment"] == "응답1"
+    assert result["fitness"] is None
+    log = team.workflow_logs[-1]
+    assert log["steps"][-1]["status"] == "expired"
+    assert log["expired_steps"] >= 1
+    assert log["cancelled_steps"] == 0
+
+
+def test_model_error_is_recorded_as_failure_not_cancellation(make_team):
+    team = make_team(StubModel(error=ValueError("quota exceeded")))
+
+    with pytest.raises(ValueError):
+        team.get_health_advice("체중 관리", {}, RequestContext())
+
+    log = team.workflow_logs[-1]
+    assert log["status"] == "failed"
+    assert [step["status"] for step in log["steps"]] == ["failed", "skipped", "skipped"]
+    assert (log["cancelled_steps"], log["expired_steps"], log["failed_steps"]) == (0, 0, 1)
+    assert "quota exceeded" in log["error"]
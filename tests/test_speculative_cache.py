@@ -0,0 +1,166 @@
+import time
+
+import pytest
+
+from health_care_coach import HealthAssessmentCoach, RequestContext, SpeculativeAssessmentCache
+from conftest import StubModel
+
+WEIGHT_INPUT = {
+    "height": "172", "current_weight": "82", "target_weight": "72", "age": "38",
+    "gender": "남성", "activity_level": "가벼운 활동", "health_issues": "",
+}
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def model():
+    return StubModel()
+
+
+@pytest.fixture
+def cache():
+    return SpeculativeAssessmentCache(debounce_seconds=0.05, max_launches=2, ttl_seconds=60)
+
+
+def observe(cache, model, input_data=WEIGHT_INPUT):
+    cache.observe(lambda: HealthAssessmentCoach(model), "체중 관리", dict(input_data))
+
+
+def test_launches_once_after_inputs_are_stable(cache, model):
+    observe(cache, model)
+    observe(cache, model)
+    assert wait_until(lambda: model.finished.is_set())
+    time.sleep(0.1)
+
+    assert len(model.calls) == 1
+    assert cache.metrics_snapshot()["launched"] == 1
+
+
+def test_does_not_launch_until_required_fields_are_valid(cache, model):
+    observe(cache, model, dict(WEIGHT_INPUT, age="3살"))
+    time.sleep(0.2)
+
+    assert model.calls == []
+
+
+def test_result_is_reused_only_for_identical_prompt_inputs(cache, model):
+    observe(cache, model)
+    assert wait_until(lambda: model.finished.is_set())
+
+    # 평가 프롬프트에 쓰이지 않는 항목은 달라도 적중
+    result = cache.take("체중 관리", dict(WEIGHT_INPUT, diet_restrictions="없음"), RequestContext())
+
+    assert result == "응답1"
+    assert cache.metrics_snapshot()["hits"] == 1
+
+
+def test_changed_inputs_discard_the_prewarmed_result(cache, model):
+    observe(cache, model)
+    assert wait_until(lambda: model.finished.is_set())
+
+    result = cache.take("체중 관리", dict(WEIGHT_INPUT, target_weight="70"), RequestContext())
+
+    assert result is None
+    metrics = cache.metrics_snapshot()
+    assert (metrics["misses"], metrics["wasted"]) == (1, 1)
+
+
+def test_in_flight_result_is_awaited(cache):
+    model = StubModel(delay=0.3)
+    observe(cache, model)
+    assert wait_until(lambda: model.calls)
+
+    result = cache.take("체중 관리", WEIGHT_INPUT, RequestContext())
+
+    assert result == "응답1"
+    metrics = cache.metrics_snapshot()
+    assert (metrics["hits"], metrics["in_flight_hits"]) == (1, 1)
+
+
+def test_expired_result_is_discarded(model):
+    cache = SpeculativeAssessmentCache(debounce_seconds=0.05, ttl_seconds=0.05)
+    observe(cache, model)
+    assert wait_until(lambda: model.finished.is_set())
+    time.sleep(0.2)
+
+    assert cache.take("체중 관리", WEIGHT_INPUT, RequestContext()) is None
+    assert cache.metrics_snapshot()["wasted"] == 1
+
+
+def test_launches_stop_at_the_spend_cap(cache, model):
+    for age in ("30", "31", "32"):
+        observe(cache, model, dict(WEIGHT_INPUT, age=age))
+        assert wait_until(lambda: cache._pending_key is None)
+        time.sleep(0.05)
+
+    assert len(model.calls) == 2
+    metrics = cache.metrics_snapshot()
+    assert (metrics["launched"], metrics["capped"]) == (2, 1)
+
+
+def test_cancel_stops_a_scheduled_launch(cache, model):
+    observe(cache, model)
+    cache.cancel()
+    time.sleep(0.2)
+
+    assert model.calls == []
+
+
+def test_cancel_abandons_an_in_flight_launch(cache):
+    model = StubModel(delay=0.3)
+    observe(cache, model)
+    assert wait_until(lambda: model.calls)
+    entry = cache._entry
+
+    cache.cancel()
+
+    assert entry["context"].is_cancelled()
+    assert cache.take("체중 관리", WEIGHT_INPUT, RequestContext()) is None
+    assert cache.metrics_snapshot()["wasted"] == 1
+
+
+def test_pipeline_marks_prewarmed_assessment(cache, make_team):
+    model = StubModel()
+    team = make_team(model)
+    observe(cache, model)
+    assert wait_until(lambda: model.finished.is_set())
+
+    result = team.get_health_advice("체중 관리", WEIGHT_INPUT, RequestContext(), cache)
+
+    assert result["assessment"] == "응답1"
+    assert len(model.calls) == 3
+    assert team.workflow_logs[-1]["steps"][0]["prewarmed"] is True
+
+
+def test_taken_inputs_are_not_prewarmed_again(cache, model):
+    observe(cache, model)
+    assert wait_until(lambda: model.finished.is_set())
+    assert cache.take("체중 관리", WEIGHT_INPUT, RequestContext()) == "응답1"
+
+    # 결과 화면에서 다른 위젯을 눌러 같은 입력으로 재실행되어도 다시 실행하지 않음
+    observe(cache, model)
+    time.sleep(0.2)
+
+    assert len(model.calls) == 1
+    assert cache.metrics_snapshot()["launched"] == 1
+
+
+def test_inputs_analyzed_after_a_miss_are_not_prewarmed(cache, model):
+    assert cache.take("체중 관리", WEIGHT_INPUT, RequestContext()) is None
+
+    observe(cache, model)
+    time.sleep(0.2)
+    assert model.calls == []
+
+    # 입력이 바뀌면 다시 사전 실행
+    observe(cache, model, dict(WEIGHT_INPUT, target_weight="70"))
+    assert wait_until(lambda: model.finished.is_set())
+    assert cache.metrics_snapshot()["launched"] == 1